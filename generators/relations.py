@@ -1,192 +1,445 @@
-import random
+import os
+import shutil
 import string
 import argparse
+import multiprocessing
+from contextlib import contextmanager
 
+import numpy as np
 
-def generate_relation_fast(file_path: str, n: int = 1000, density: float = 0.02):
+# Output is built as bytes and flushed to disk in chunks of this size
+FLUSH_SIZE = 2 << 20
+
+# Pairs serialized per emit_pairs call, about FLUSH_SIZE at 16 bytes per line
+PAIRS_PER_SLICE = 1 << 17
+
+# Above this hit probability, testing every cell against one uniform draw
+# is cheaper than skipping between hits with geometric gaps
+DENSE_THRESHOLD = 0.125
+
+SYMBOL_POOL = string.ascii_letters + string.digits + string.punctuation
+
+# Inclusive code point ranges for which str.isspace() is true
+WHITESPACE_RANGES = [
+    (0x0009, 0x000D),
+    (0x001C, 0x0020),
+    (0x0085, 0x0085),
+    (0x00A0, 0x00A0),
+    (0x1680, 0x1680),
+    (0x2000, 0x200A),
+    (0x2028, 0x2029),
+    (0x202F, 0x202F),
+    (0x205F, 0x205F),
+    (0x3000, 0x3000),
+]
+
+
+@contextmanager
+def open_raw(file_path: str):
     """
-    Generate a large relation test file using only non-space symbols.
-    Optimized for speed with n=100,000.
+    Open file_path for writing as a raw file descriptor, bypassing
+    Python's buffered and text IO layers.
     """
-    symbol_pool = string.ascii_letters + string.digits + string.punctuation
+    # O_BINARY only exists (and matters) on Windows, where it stops "\n"
+    # from being rewritten as "\r\n"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(file_path, flags, 0o644)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
 
-    # Generate base set
-    if n > len(symbol_pool):
-        extra_needed = n - len(symbol_pool)
-        extra_symbols = []
-        code_point = 0x2600  # Start from safe range
 
-        while len(extra_symbols) < extra_needed:
-            # Skip the surrogate range (0xD800-0xDFFF)
-            if 0xD800 <= code_point <= 0xDFFF:
-                code_point = 0xE000
-                continue
+def write_all(fd: int, data):
+    """Write all of data to fd, retrying on short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
 
-            try:
-                char = chr(code_point)
-                if not char.isspace():
-                    extra_symbols.append(char)
-            except (ValueError, UnicodeEncodeError):
-                pass
 
-            code_point += 1
-            if code_point > 0x10FFFF:
-                # If we run out of Unicode, reuse existing pool
-                extra_symbols = extra_symbols * (
-                    (extra_needed // len(extra_symbols)) + 1
-                )
-                break
+def unicode_symbols(count: int, start: int = 0x2600) -> list:
+    """
+    Return count non-space symbols, taking code points upwards from start.
+    Surrogates and whitespace are masked out by range on a NumPy array
+    instead of probing every character with chr() and isspace().
+    """
+    # At most the surrogate block and the whitespace ranges get skipped
+    stop = min(start + count + 0x800 + 0x40, 0x110000)
+    code_points = np.arange(start, stop)
 
-        base = list(symbol_pool) + extra_symbols[:extra_needed]
-    else:
-        base = random.sample(symbol_pool, n)
+    keep = (code_points < 0xD800) | (code_points > 0xDFFF)
+    for lo, hi in WHITESPACE_RANGES:
+        keep &= (code_points < lo) | (code_points > hi)
 
-    # OPTIMIZATION 1: Write in large chunks instead of line by line
-    with open(file_path, "w", encoding="utf-8", buffering=8192 * 8) as f:
-        # Write header line
-        f.write(" ".join(base) + "\n")
+    symbols = list(map(chr, code_points[keep][:count].tolist()))
+    if len(symbols) < count:
+        # If we run out of Unicode, reuse existing pool
+        symbols = (symbols * (count // len(symbols) + 1))[:count]
+    return symbols
 
-        # OPTIMIZATION 2: Pre-calculate total pairs and use batch writing
-        total_pairs_expected = int(n * n * density)
-        print(f"Generating approximately {total_pairs_expected:,} pairs...")
 
-        # OPTIMIZATION 3: Use list comprehension and join for batch writing
-        batch_size = 10000
-        batch = []
+# Non-space symbols to extend SYMBOL_POOL with, filtered once at import
+UNICODE_EXTRAS = unicode_symbols(200_000)
 
-        # OPTIMIZATION 4: Use random choices for entire row at once
-        # Generate all random values in advance
-        random_values = random.random()
 
-        # For very large n, we need a smarter approach
-        if n * n * density > 1000000:
-            # OPTIMIZATION 5: For sparse matrices, generate indices directly
-            # This is MUCH faster for low densities
+def base_set(n: int, rng: np.random.Generator) -> list:
+    """
+    Return n distinct non-space symbols for the base set.
+    Small sets are a random sample of SYMBOL_POOL; larger ones are the whole
+    pool followed by a slice of the cached UNICODE_EXTRAS.
+    """
+    if n <= len(SYMBOL_POOL):
+        return rng.choice(list(SYMBOL_POOL), size=n, replace=False).tolist()
+
+    extra_needed = n - len(SYMBOL_POOL)
+    if extra_needed <= len(UNICODE_EXTRAS):
+        return list(SYMBOL_POOL) + UNICODE_EXTRAS[:extra_needed]
+    return list(SYMBOL_POOL) + unicode_symbols(extra_needed)
 
-            # Calculate total pairs to generate
-            total_pairs = int(n * n * density)
 
-            # Generate random indices
-            indices = random.sample(range(n * n), total_pairs)
+def bernoulli_mask(shape, p: float, rng: np.random.Generator):
+    """
+    Return a boolean array of the given shape, each entry True with probability p.
+    Raw uint32 draws are compared to an integer threshold, skipping the
+    conversion to floats in [0, 1).
+    """
+    threshold = int(p * (1 << 32))
+    return rng.integers(0, 1 << 32, size=shape, dtype=np.uint32) < threshold
 
-            # Convert to coordinates and write
-            for idx in indices:
-                i = idx // n
-                j = idx % n
-                batch.append(f"{base[i]} {base[j]}")
 
-                # Write in batches
-                if len(batch) >= batch_size:
-                    f.write("\n".join(batch) + "\n")
-                    batch = []
+def bernoulli_indices(
+    lo: int, hi: int, p: float, rng: np.random.Generator, chunk: int = 1 << 20
+):
+    """
+    Yield sorted flat indices from range(lo, hi), each taken with probability p.
+    Sparse ranges jump between hits with geometric gaps, dense ones mask a
+    chunk of uniform draws; either way only O(chunk) memory is used.
+    """
+    if p <= 0.0 or lo >= hi:
+        return
+    if p >= 1.0:
+        for start in range(lo, hi, chunk):
+            yield np.arange(start, min(start + chunk, hi))
+        return
+    if p > DENSE_THRESHOLD:
+        for start in range(lo, hi, chunk):
+            stop = min(start + chunk, hi)
+            yield start + np.flatnonzero(bernoulli_mask(stop - start, p, rng))
+        return
+
+    # Don't draw a full chunk of gaps when far fewer hits are expected
+    size = min(chunk, int((hi - lo) * p * 1.05) + 16)
+    last = lo - 1
+    while True:
+        # A gap reaching past hi already ends the range; clipping it keeps the
+        # cumsum from overflowing int64 when p is tiny
+        gaps = np.minimum(rng.geometric(p, size=size), hi - last)
+        indices = last + np.cumsum(gaps)
+        if indices[-1] >= hi:
+            yield indices[indices < hi]
+            return
+        yield indices
+        last = int(indices[-1])
+
+
+def pair_stream(
+    n: int,
+    density: float,
+    lo: int,
+    hi: int,
+    rng: np.random.Generator,
+    block_cells: int = 1 << 20,
+):
+    """
+    Yield (rows, cols) index arrays for rows lo..hi-1 of a random relation on
+    n elements, in row-major order. Only one block of indices exists at a
+    time, so memory stays bounded whatever n and density are.
+    For density > 0.5, the missing pairs are sampled and knocked out instead.
+    """
+    if n == 0:
+        return
+    if density <= 0.5:
+        for indices in bernoulli_indices(lo * n, hi * n, density, rng):
+            yield np.divmod(indices, n)
+        return
+
+    # Knock the missing pairs out of each block of rows and split
+    # the survivors into coordinates with one vectorized divmod,
+    # instead of a set lookup and idx // n, idx % n per pair
+    rows_per_block = max(1, block_cells // n)
+    for block_lo in range(lo, hi, rows_per_block):
+        block_hi = min(block_lo + rows_per_block, hi)
+        present = np.ones((block_hi - block_lo) * n, dtype=bool)
+        for indices in bernoulli_indices(
+            block_lo * n, block_hi * n, 1.0 - density, rng
+        ):
+            present[indices - block_lo * n] = False
+
+        rows, cols = np.divmod(np.flatnonzero(present), n)
+        yield rows + block_lo, cols
+
+
+def encode_symbols(base: list):
+    """
+    Build the byte tables emit_pairs gathers "a b" lines from.
+    heads[k] holds "a " and tails[k] holds "b\\n" for symbol k, zero-padded to
+    whole 8-byte words and viewed as uint64 so each lookup copies whole words.
+    mask marks the real bytes of each row, or is None if nothing is padded.
+    """
+    encoded = [sym.encode() for sym in base]
+    lengths = np.array([len(sym) + 1 for sym in encoded], dtype=np.int64)
+    width = -(-int(lengths.max(initial=1)) // 8) * 8
 
-            # Write remaining
-            if batch:
-                f.write("\n".join(batch) + "\n")
+    heads = b"".join((sym + b" ").ljust(width, b"\0") for sym in encoded)
+    tails = b"".join((sym + b"\n").ljust(width, b"\0") for sym in encoded)
+    heads = np.frombuffer(heads, dtype=np.uint64).reshape(len(base), width // 8)
+    tails = np.frombuffer(tails, dtype=np.uint64).reshape(len(base), width // 8)
 
-        else:
-            # For moderate densities, use row-by-row with optimization
-            random_threshold = density
+    if (lengths == width).all():
+        return heads, tails, None
+    mask = np.arange(width) < lengths[:, None]
+    return heads, tails, mask.view(np.uint64)
 
-            for i in range(n):
-                # Generate a row of random values at once
-                row_random = [random.random() for _ in range(n)]
 
-                for j in range(n):
-                    if row_random[j] < random_threshold:
-                        batch.append(f"{base[i]} {base[j]}")
+def encode_integers(n: int):
+    """
+    Build encode_symbols tables for the labels 0..n-1 straight from an
+    integer array: decimal digits are peeled off with vectorized // and %,
+    so no Python string is created per label.
+    """
+    values = np.arange(n, dtype=np.int64)
+    digits = np.searchsorted(10 ** np.arange(1, 19), values, side="right") + 1
+    lengths = digits + 1
+    width = -(-int(lengths.max(initial=1)) // 8) * 8
+
+    heads = np.zeros((n, width), dtype=np.uint8)
+    for k in range(int(digits.max(initial=0))):
+        # k-th digit from the left of every label that is long enough
+        has = digits > k
+        heads[has, k] = ord("0") + values[has] // 10 ** (digits[has] - 1 - k) % 10
+    tails = heads.copy()
+    heads[values, digits] = ord(" ")
+    tails[values, digits] = ord("\n")
+
+    heads, tails = heads.view(np.uint64), tails.view(np.uint64)
+    if (lengths == width).all():
+        return heads, tails, None
+    mask = np.arange(width) < lengths[:, None]
+    return heads, tails, mask.view(np.uint64)
+
+
+def emit_pairs(symbols, rows, cols, out: np.ndarray) -> int:
+    """
+    Write the "a b" lines for the (rows[k], cols[k]) pairs into the uint8
+    array out and return how many bytes were written. out needs room for
+    16 bytes per table word per pair, the size before padding is dropped.
+    Lines are assembled as rows of a word matrix by fancy-indexing the
+    encode_symbols tables, so the per-pair copying runs in NumPy's C loops.
+    """
+    heads, tails, mask = symbols
+    words = heads.shape[1]
+
+    block = np.empty((len(rows), 2 * words), dtype=np.uint64)
+    block[:, :words] = heads[rows]
+    block[:, words:] = tails[cols]
+    lines = block.view(np.uint8).reshape(-1)
+
+    if mask is None:
+        out[: lines.size] = lines
+        return lines.size
+
+    # Drop the zero padding between and after the symbols, compressing
+    # straight into out instead of into a fresh array
+    keep = np.empty((len(rows), 2 * words), dtype=np.uint64)
+    keep[:, :words] = mask[rows]
+    keep[:, words:] = mask[cols]
+    keep = keep.view(bool).reshape(-1)
+    size = int(np.count_nonzero(keep))
+    np.compress(keep, lines, out=out[:size])
+    return size
+
+
+def generate_relation_fast(
+    file_path: str,
+    n: int = 1000,
+    density: float = 0.02,
+    labels: str = "symbols",
+    seed: int | None = None,
+):
+    """
+    Generate a large relation test file using only non-space symbols.
+    Optimized for speed with n=100,000.
+    With labels="int", elements are the integers 0..n-1 instead, which is
+    cheaper to format when the symbols themselves don't matter. That output
+    is NOT valid input for -t2: its reader keeps only the first character
+    of each label, so e.g. 1, 10 and 11 would all become the element '1'.
+    Passing a seed makes the output reproducible.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
 
-                        # Write in batches
-                        if len(batch) >= batch_size:
-                            f.write("\n".join(batch) + "\n")
-                            batch = []
+    # Generate base set
+    if labels == "int":
+        base = list(map(str, range(n)))
+        symbols = encode_integers(n)
+    else:
+        base = base_set(n, rng)
+        symbols = encode_symbols(base)
 
-            # Write any remaining pairs
-            if batch:
-                f.write("\n".join(batch) + "\n")
+    # OPTIMIZATION 1: Write raw bytes straight to the file descriptor
+    # in large chunks instead of line by line
+    with open_raw(file_path) as fd:
+        # Write header line
+        write_all(fd, (" ".join(base) + "\n").encode())
+
+        # OPTIMIZATION 2: Pre-calculate total pairs and use batch writing
+        total_pairs_expected = int(n * n * density)
+        print(f"Generating approximately {total_pairs_expected:,} pairs...")
+
+        # OPTIMIZATION 3: Stream sampled blocks of pairs straight into
+        # the output, never holding the whole relation in memory
+        write_rows(fd, symbols, density, 0, n, rng)
 
     print(f"✅ Generated {file_path} with n={n}, density={density}")
     print(f"   Base set size: {len(base)} symbols")
 
 
-def generate_relation_very_fast(file_path: str, n: int = 100000, density: float = 0.99):
+def write_rows(
+    fd: int, symbols, density: float, lo: int, hi: int, rng: np.random.Generator
+):
+    """
+    Write the pairs of rows lo..hi-1 of a random relation to fd, using the
+    label tables from encode_symbols or encode_integers.
+    Lines are serialized directly into one preallocated scratch buffer that
+    is flushed whenever it passes FLUSH_SIZE; only emit_pairs' per-slice
+    gather temporaries are allocated inside the loop.
+    """
+    n = len(symbols[0])
+    # Room for one worst-case slice on top of up to FLUSH_SIZE unflushed bytes
+    slice_bytes = PAIRS_PER_SLICE * 16 * symbols[0].shape[1]
+    scratch = np.empty(FLUSH_SIZE + slice_bytes, dtype=np.uint8)
+    pos = 0
+
+    for rows, cols in pair_stream(n, density, lo, hi, rng):
+        for start in range(0, len(rows), PAIRS_PER_SLICE):
+            stop = start + PAIRS_PER_SLICE
+            pos += emit_pairs(
+                symbols, rows[start:stop], cols[start:stop], scratch[pos:]
+            )
+
+            if pos > FLUSH_SIZE:
+                write_all(fd, scratch[:pos])
+                pos = 0
+
+    write_all(fd, scratch[:pos])
+
+
+def write_shard(args):
+    """
+    Pool worker: write rows lo..hi-1 to their own part file.
+    Takes a single tuple so it can be used with Pool.map.
+    """
+    part_path, symbols, density, lo, hi, seed = args
+    with open_raw(part_path) as fd:
+        write_rows(fd, symbols, density, lo, hi, np.random.default_rng(seed))
+    return part_path
+
+
+def append_file(fd: int, part_path: str):
+    """
+    Append the whole of part_path to fd. Uses os.sendfile where the platform
+    allows it between regular files, and a buffered copy everywhere else.
+    """
+    with open(part_path, "rb") as part:
+        size = os.fstat(part.fileno()).st_size
+        offset = 0
+        if hasattr(os, "sendfile"):
+            try:
+                while offset < size:
+                    offset += os.sendfile(fd, part.fileno(), offset, size - offset)
+                return
+            except OSError:
+                # e.g. macOS, where sendfile only writes to sockets
+                pass
+
+        part.seek(offset)
+        with open(fd, "wb", closefd=False) as out:
+            shutil.copyfileobj(part, out, FLUSH_SIZE)
+
+
+def generate_relation_very_fast(
+    file_path: str,
+    n: int = 100000,
+    density: float = 0.99,
+    jobs: int = 1,
+    labels: str = "symbols",
+    seed: int | None = None,
+):
     """
     Ultra-fast version for very large n and high density.
     For density >= 0.5, it's faster to generate all pairs and skip some.
+    With jobs > 1, rows are split into equal shards written by separate
+    processes and then concatenated into file_path.
+    With labels="int", elements are the integers 0..n-1; as with
+    generate_relation_fast, that output is NOT valid input for -t2.
+    Passing a seed makes the output reproducible for a given number of jobs.
     """
-    symbol_pool = string.ascii_letters + string.digits + string.punctuation
+    seed_seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_seq)
 
-    # Generate base set (same as before)
-    if n > len(symbol_pool):
-        extra_needed = n - len(symbol_pool)
-        # Use a simpler approach for speed
-        extra_symbols = [f"X{i:06d}" for i in range(extra_needed)]
-        base = list(symbol_pool) + extra_symbols[:extra_needed]
+    # Generate base set
+    if labels == "int":
+        base = list(map(str, range(n)))
+        symbols = encode_integers(n)
     else:
-        base = random.sample(symbol_pool, n)
-
-    with open(file_path, "w", encoding="utf-8", buffering=8192 * 16) as f:
-        # Write header
-        f.write(" ".join(base) + "\n")
+        base = base_set(n, rng)
+        symbols = encode_symbols(base)
+
+    # For very high density like 0.99, generate complement instead
+    if density > 0.5:
+        total_missing = int(n * n * (1.0 - density))
+        print(
+            f"High density ({density:.2f}), generating ~{total_missing:,} missing pairs..."
+        )
+    else:
+        total_pairs = int(n * n * density)
+        print(f"Generating ~{total_pairs:,} random pairs...")
 
-        # For very high density like 0.99, generate complement instead
-        if density > 0.5:
-            # Generate missing pairs instead of existing ones
-            missing_density = 1.0 - density
-            total_missing = int(n * n * missing_density)
+    jobs = max(1, min(jobs, n))
 
-            print(
-                f"High density ({density:.2f}), generating {total_missing:,} missing pairs..."
-            )
+    with open_raw(file_path) as fd:
+        # Write header
+        write_all(fd, (" ".join(base) + "\n").encode())
 
-            if total_missing == 0:
-                # Write all pairs (density = 1.0 or very close)
-                batch = []
-                for i in range(n):
-                    for j in range(n):
-                        batch.append(f"{base[i]} {base[j]}")
-                        if len(batch) >= 10000:
-                            f.write("\n".join(batch) + "\n")
-                            batch = []
-                if batch:
-                    f.write("\n".join(batch) + "\n")
-            else:
-                # Generate missing indices
-                missing_indices = set(random.sample(range(n * n), total_missing))
-
-                # Write all pairs except missing ones
-                batch = []
-                for idx in range(n * n):
-                    if idx not in missing_indices:
-                        i = idx // n
-                        j = idx % n
-                        batch.append(f"{base[i]} {base[j]}")
-
-                        if len(batch) >= 10000:
-                            f.write("\n".join(batch) + "\n")
-                            batch = []
-
-                if batch:
-                    f.write("\n".join(batch) + "\n")
+        if jobs == 1:
+            write_rows(fd, symbols, density, 0, n, rng)
         else:
-            # For low density, use direct random generation
-            total_pairs = int(n * n * density)
-            print(f"Generating {total_pairs:,} random pairs...")
-
-            indices = random.sample(range(n * n), total_pairs)
-            batch = []
-
-            for idx in indices:
-                i = idx // n
-                j = idx % n
-                batch.append(f"{base[i]} {base[j]}")
+            # Every shard gets an independent random stream
+            seeds = seed_seq.spawn(jobs)
+            bounds = [n * k // jobs for k in range(jobs + 1)]
+            tasks = [
+                (
+                    f"{file_path}.part{k}",
+                    symbols,
+                    density,
+                    bounds[k],
+                    bounds[k + 1],
+                    seeds[k],
+                )
+                for k in range(jobs)
+            ]
 
-                if len(batch) >= 10000:
-                    f.write("\n".join(batch) + "\n")
-                    batch = []
+            part_paths = [task[0] for task in tasks]
+            try:
+                with multiprocessing.Pool(jobs) as pool:
+                    pool.map(write_shard, tasks)
 
-            if batch:
-                f.write("\n".join(batch) + "\n")
+                for part_path in part_paths:
+                    append_file(fd, part_path)
+            finally:
+                # Don't leave part files behind if a worker failed
+                for part_path in part_paths:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
 
     print(f"✅ Generated {file_path} with n={n}, density={density}")
 
@@ -222,13 +475,42 @@ def main():
         action="store_true",
         help="Use ultra-fast generation method (recommended for n > 10000)",
     )
+    parser.add_argument(
+        "-l",
+        "--labels",
+        choices=["symbols", "int"],
+        default="symbols",
+        help=(
+            "Element labels: single symbols or integers 0..n-1 (default: symbols). "
+            "Integer output is NOT valid input for -t2, which only reads the "
+            "first character of each label"
+        ),
+    )
+    parser.add_argument(
+        "-s",
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for reproducible output (default: random)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for the ultra-fast method (default: 1)",
+    )
 
     args = parser.parse_args()
 
     if args.fast or args.num > 10000:
-        generate_relation_very_fast(args.output, args.num, args.density)
+        generate_relation_very_fast(
+            args.output, args.num, args.density, args.jobs, args.labels, args.seed
+        )
     else:
-        generate_relation_fast(args.output, args.num, args.density)
+        generate_relation_fast(
+            args.output, args.num, args.density, args.labels, args.seed
+        )
 
 
 if __name__ == "__main__":
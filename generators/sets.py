@@ -1,9 +1,15 @@
-import random
 import string
+from itertools import permutations
+
+import numpy as np
 
 
 def generate_set_commands(
-    file_path: str, n_sets: int = 3, elements_per_set: int = 5, universe_size: int = 10
+    file_path: str,
+    n_sets: int = 3,
+    elements_per_set: int = 5,
+    universe_size: int = 10,
+    seed: int | None = None,
 ):
     """
     Generate a file with random set manipulation commands.
@@ -28,7 +34,9 @@ def generate_set_commands(
         n_sets: how many sets to create
         elements_per_set: approximate number of elements to add to each
         universe_size: number of unique elements to pick from (e.g. 10 → {'a'..'j'})
+        seed: random seed for reproducible output (None → fresh entropy)
     """
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
     letters = string.ascii_lowercase[:universe_size]
     set_names = [chr(ord("A") + i) for i in range(n_sets)]
 
@@ -38,7 +46,9 @@ def generate_set_commands(
         lines.append(f"new {name}")
 
     for name in set_names:
-        elems = random.sample(letters, k=min(elements_per_set, universe_size))
+        elems = rng.choice(
+            list(letters), size=min(elements_per_set, universe_size), replace=False
+        ).tolist()
         for e in elems:
             lines.append(f"add {name} {e}")
 
@@ -46,28 +56,32 @@ def generate_set_commands(
     for name in set_names:
         lines.append(f"see {name}")
 
-    for a in set_names:
-        for b in set_names:
-            if a != b:
-                lines.append(f"{a} + {b}")
-                lines.append(f"{a} & {b}")
-                lines.append(f"{a} - {b}")
-                lines.append(f"{a} < {b}")
-                lines.append(f"{b} < {a}")
-                lines.append(f"{a} = {b}")
+    lines.extend(
+        line
+        for a, b in permutations(set_names, 2)
+        for line in (
+            f"{a} + {b}",
+            f"{a} & {b}",
+            f"{a} - {b}",
+            f"{a} < {b}",
+            f"{b} < {a}",
+            f"{a} = {b}",
+        )
+    )
 
     for name in set_names:
         lines.append(f"pow {name}")
-        to_remove = random.choice(letters)
+        to_remove = letters[rng.integers(len(letters))]
         lines.append(f"rem {name} {to_remove}")
 
-    for name in random.sample(set_names, k=len(set_names) // 2 or 1):
+    for name in rng.choice(set_names, size=len(set_names) // 2 or 1, replace=False):
         lines.append(f"del {name}")
 
     lines.append("see")
 
     with open(file_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
+        f.write("\n".join(lines))
+        f.write("\n")
 
     print(
         f"✅ Generated {file_path} with {len(set_names)} sets and {len(lines)} commands."